@@ -0,0 +1,43 @@
+import httpx
+
+from typing import Optional
+
+try:
+    import h2  # noqa: F401 — enables HTTP/2 in httpx
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
+
+# ---------------------------------------------------------------------------
+# Shared HTTP client
+# ---------------------------------------------------------------------------
+# One connection-pooled client for every analyzer network call (Blockscout
+# and JSON-RPC). With HTTP/2, concurrent requests to the same host are
+# multiplexed over a single TCP/TLS connection.
+# ---------------------------------------------------------------------------
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """
+    Return the shared client, creating it on first use (or after close_client()).
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            http2=HTTP2,
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=16),
+            timeout=15,
+        )
+    return _client
+
+
+async def close_client():
+    """
+    Close the shared client. Call once before the event loop shuts down.
+    """
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
@@ -1,6 +1,14 @@
-from web3 import Web3
+import asyncio
+import orjson
+from eth_abi import encode, decode
+from eth_utils import to_checksum_address
 import os
+from cachetools import TTLCache
+from threading import Lock
 from dotenv import load_dotenv
+from typing import List, Optional, Tuple
+
+from analyzers.http import get_client, close_client
 
 load_dotenv()
 
@@ -13,72 +21,291 @@ RPC_MAP = {
     "bsc": os.getenv("BSC_RPC_URL", "https://bsc-dataseed.binance.org"),
 }
 
+# Successful scan results per (chain, address). Token metadata and owner only
+# change on human timescales, so a short TTL avoids re-querying the RPC when
+# users run /scan and /score back to back. Errors, and results assembled
+# around a transient RPC failure, are never cached.
+ONCHAIN_CACHE_TTL = 300
+_ONCHAIN_CACHE = TTLCache(maxsize=4096, ttl=ONCHAIN_CACHE_TTL)
+_ONCHAIN_LOCK = Lock()
+
+RPC_TIMEOUT = 10
+
+
+async def _rpc_post(chain: str, payload):
+    resp = await get_client().post(
+        RPC_MAP[chain],
+        content=orjson.dumps(payload),
+        headers={"Content-Type": "application/json"},
+        timeout=RPC_TIMEOUT,
+    )
+    resp.raise_for_status()
+    return orjson.loads(resp.content)
+
+
+async def _rpc_batch(chain: str, calls: List[Tuple[str, list]]) -> List[Optional[dict]]:
+    """
+    POST several JSON-RPC calls as one batch over the shared HTTP client.
+    Returns each call's reply object in order (None if the node left it out).
+    """
+    payload = [
+        {"jsonrpc": "2.0", "id": i, "method": method, "params": params}
+        for i, (method, params) in enumerate(calls)
+    ]
+    replies = await _rpc_post(chain, payload)
+    if not isinstance(replies, list):
+        raise RuntimeError(f"RPC rejected batch request: {replies}")
+
+    by_id = {reply.get("id"): reply for reply in replies if isinstance(reply, dict)}
+    return [by_id.get(i) for i in range(len(calls))]
+
+
+async def _rpc_call(chain: str, method: str, params: list) -> Optional[dict]:
+    """
+    Single (non-batch) JSON-RPC call. Returns the reply object.
+    """
+    reply = await _rpc_post(chain, {"jsonrpc": "2.0", "id": 0, "method": method, "params": params})
+    return reply if isinstance(reply, dict) else None
+
+
+def _is_revert(error) -> bool:
+    # Geth-style nodes use code 3, others -32000 with an "execution reverted" message
+    return isinstance(error, dict) and (
+        error.get("code") == 3 or "revert" in str(error.get("message", "")).lower()
+    )
+
+
+async def _rpc_calls(chain: str, calls: List[Tuple[str, list]]) -> Tuple[List[Optional[str]], bool]:
+    """
+    Send calls as one batch; if the RPC rejects or caps batch requests, fall
+    back to one POST per call (sent concurrently).
+
+    Returns (results, complete). Failed calls come back as None; complete is
+    False if any call failed for a transient reason (transport error, timeout,
+    rate limit, missing reply) rather than a contract revert, so the outcome
+    should not be cached.
+    """
+    try:
+        replies = await _rpc_batch(chain, calls)
+    except Exception:
+        replies = await asyncio.gather(
+            *(_rpc_call(chain, method, params) for method, params in calls),
+            return_exceptions=True,
+        )
+        replies = [None if isinstance(reply, Exception) else reply for reply in replies]
+
+    results = [reply.get("result") if reply else None for reply in replies]
+    complete = all(
+        reply is not None and ("result" in reply or _is_revert(reply.get("error")))
+        for reply in replies
+    )
+    return results, complete
+
+
+def _hex_to_bytes(value: str) -> bytes:
+    return bytes.fromhex(value[2:] if value.startswith("0x") else value)
+
+# ---------------------------------------------------------------------------
+# Multicall3 (deployed at the same address on Ethereum and BSC)
+# ---------------------------------------------------------------------------
+
+MULTICALL3 = "0xcA11bde05977b3631167028862bE2a173976CA11"
+AGGREGATE3_SELECTOR = bytes.fromhex("82ad56cb")  # aggregate3((address,bool,bytes)[])
+
+NAME_SELECTOR = bytes.fromhex("06fdde03")    # name()
+SYMBOL_SELECTOR = bytes.fromhex("95d89b41")  # symbol()
+OWNER_SELECTOR = bytes.fromhex("8da5cb5b")   # owner()
+TRANSFER_SELECTOR = bytes.fromhex("a9059cbb")            # transfer(address,uint256)
+MINT_SELECTOR = bytes.fromhex("40c10f19")                # mint(address,uint256)
+RENOUNCE_OWNERSHIP_SELECTOR = bytes.fromhex("715018a6")  # renounceOwnership()
+
+# Selectors reported from the deployed bytecode (works on unverified contracts)
+BYTECODE_SELECTORS = {
+    "owner()": OWNER_SELECTOR,
+    "mint(address,uint256)": MINT_SELECTOR,
+    "renounceOwnership()": RENOUNCE_OWNERSHIP_SELECTOR,
+}
+
+
+# ---------------------------------------------------------------------------
+# Proxy detection
+# ---------------------------------------------------------------------------
+# A proxy's own dispatcher only holds admin selectors, so token selectors must
+# be looked up in the implementation's bytecode instead.
+
+# bytes32(uint256(keccak256("eip1967.proxy.implementation")) - 1)
+EIP1967_IMPLEMENTATION_SLOT = "0x360894a13ba1a3210667c828492db98dca3e2076cc3735a920a3ca505d382bbc"
+# EIP-1167 minimal proxy runtime code: prefix + 20-byte implementation + suffix
+EIP1167_PREFIX = bytes.fromhex("363d3d373d3d3d363d73")
+
+
+def _proxy_implementation(code: bytes, slot_hex: Optional[str]) -> Optional[str]:
+    """
+    Return the implementation address if the contract is an EIP-1167 minimal
+    proxy or has the EIP-1967 implementation slot set, else None.
+    """
+    if code.startswith(EIP1167_PREFIX) and len(code) >= len(EIP1167_PREFIX) + 20:
+        impl = code[len(EIP1167_PREFIX):len(EIP1167_PREFIX) + 20]
+        return to_checksum_address("0x" + impl.hex())
+
+    if slot_hex:
+        impl = _hex_to_bytes(slot_hex)[-20:]
+        if any(impl):
+            return to_checksum_address("0x" + impl.hex())
+    return None
+
+
+def _aggregate3_tx(address: str, selectors: list) -> dict:
+    calls = [(address, True, selector) for selector in selectors]
+    data = AGGREGATE3_SELECTOR + encode(["(address,bool,bytes)[]"], [calls])
+    return {"to": MULTICALL3, "data": "0x" + data.hex()}
+
+
+def _decode_aggregate3(raw: bytes) -> list:
+    return [ret if ok else None for ok, ret in decode(["(bool,bytes)[]"], raw)[0]]
+
+
+async def _single_calls(chain: str, address: str, selectors: list) -> Tuple[list, bool]:
+    """
+    Fallback for RPCs where Multicall3 is unavailable: one eth_call per
+    selector, batched where the RPC allows it. Returns (returns, complete).
+    """
+    raw, complete = await _rpc_calls(chain, [
+        ("eth_call", [{"to": address, "data": "0x" + selector.hex()}, "latest"])
+        for selector in selectors
+    ])
+    return [_hex_to_bytes(ret) if ret is not None else None for ret in raw], complete
+
+
+def _decode_single(abi_type: str, ret):
+    if not ret:
+        return None
+    try:
+        return decode([abi_type], ret)[0]
+    except Exception:
+        return None
+
+
 def check_honeypot_and_owner(address: str, chain: str = "ethereum"):
+    """
+    Blocking wrapper around check_honeypot_and_owner_async() for the CLI.
+    """
+    async def _run():
+        try:
+            return await check_honeypot_and_owner_async(address, chain)
+        finally:
+            await close_client()
+
+    return asyncio.run(_run())
+
+
+async def check_honeypot_and_owner_async(address: str, chain: str = "ethereum"):
     """
     Basic on-chain scanner that checks:
     - Contract code presence
     - ERC20-like info (name, symbol)
     - Owner() if available
     - Transfer() existence (honeypot flag)
+    - owner()/mint()/renounceOwnership() selectors in the bytecode
+      (the implementation's bytecode for EIP-1967 / EIP-1167 proxies)
     """
 
-    rpc_url = RPC_MAP.get(chain.lower())
-    if not rpc_url:
+    chain = chain.lower()
+    cache_key = (chain, address.lower())
+    with _ONCHAIN_LOCK:
+        cached = _ONCHAIN_CACHE.get(cache_key)
+    if cached is not None:
+        return dict(cached)
+
+    if chain not in RPC_MAP:
         return {"error": f"Unsupported chain '{chain}'. Use 'ethereum' or 'bsc'."}
 
     print(f"🔗 Connecting to {chain.title()} RPC...")
-    w3 = Web3(Web3.HTTPProvider(rpc_url))
-
-    if not w3.is_connected():
-        return {"error": f"Cannot connect to {chain.title()} RPC node."}
 
     try:
-        address = Web3.to_checksum_address(address)
+        address = to_checksum_address(address)
     except Exception:
         return {"error": "Invalid address format."}
 
-    code = w3.eth.get_code(address)
+    # Bytecode, EIP-1967 implementation slot, and name(), symbol() and owner()
+    # (via Multicall3) in a single JSON-RPC batch, i.e. one HTTP POST
+    # (separate POSTs if batching is refused).
+    selectors = [NAME_SELECTOR, SYMBOL_SELECTOR, OWNER_SELECTOR]
+    # `complete` tracks whether every lookup got a real answer; results built
+    # around a transient failure are returned but not cached.
+    (code_hex, slot_hex, multicall_hex), complete = await _rpc_calls(chain, [
+        ("eth_getCode", [address, "latest"]),
+        ("eth_getStorageAt", [address, EIP1967_IMPLEMENTATION_SLOT, "latest"]),
+        ("eth_call", [_aggregate3_tx(address, selectors), "latest"]),
+    ])
+
+    if code_hex is None:
+        return {"error": f"Cannot connect to {chain.title()} RPC node."}
+
+    code = _hex_to_bytes(code_hex)
     if not code or len(code) == 0:
         return {"error": "No contract code found (EOA address)."}
 
-    # Minimal ERC20 ABI for checks
-    abi = [
-        {"name": "name", "outputs": [{"type": "string"}], "stateMutability": "view", "type": "function"},
-        {"name": "symbol", "outputs": [{"type": "string"}], "stateMutability": "view", "type": "function"},
-        {"name": "owner", "outputs": [{"type": "address"}], "stateMutability": "view", "type": "function"},
-        {"name": "transfer", "inputs": [{"type": "address"}, {"type": "uint256"}], "outputs": [{"type": "bool"}], "stateMutability": "nonpayable", "type": "function"},
-    ]
+    # Multicall3 missing or reverted: query each selector directly
+    returns = None
+    if multicall_hex is not None:
+        try:
+            returns = _decode_aggregate3(_hex_to_bytes(multicall_hex))
+        except Exception:
+            returns = None
+    if returns is None:
+        returns, calls_complete = await _single_calls(chain, address, selectors)
+        complete = complete and calls_complete
 
-    contract = w3.eth.contract(address=address, abi=abi)
     result = {}
 
+    name = _decode_single("string", returns[0])
+    symbol = _decode_single("string", returns[1])
+    owner = _decode_single("address", returns[2])
+
     # Basic token info
-    try:
-        name = contract.functions.name().call()
-        symbol = contract.functions.symbol().call()
+    if name is not None and symbol is not None:
         result["token"] = f"{name} ({symbol})"
-    except Exception:
+    else:
         result["token"] = "Unknown Token"
 
     # Owner detection
-    try:
-        owner = contract.functions.owner().call()
+    if owner is not None:
         result["owner"] = owner
-    except Exception:
+    else:
         result["owner"] = "⚠️ Owner() not found (may use custom access control)."
 
-    # Transfer presence
-    try:
-        fn_names = [fn.fn_name for fn in contract.all_functions()]
-        result["transfer_test"] = "✅ Transfer function exists" if "transfer" in fn_names else "❌ Missing transfer()"
-    except Exception:
-        result["transfer_test"] = "⚠️ Transfer check failed"
+    # Proxies: token selectors live in the implementation (one extra request)
+    implementation = _proxy_implementation(code, slot_hex)
+    if implementation is not None:
+        result["proxy"] = f"Proxy → implementation {implementation}"
+        (impl_hex,), impl_complete = await _rpc_calls(chain, [("eth_getCode", [implementation, "latest"])])
+        complete = complete and impl_complete
+        code = _hex_to_bytes(impl_hex) if impl_hex else b""
 
-    # Honeypot indicator
-    result["honeypot_risk"] = (
-        "🟢 Transfer function present"
-        if "✅" in result["transfer_test"]
-        else "🔴 Possible Honeypot (transfer() missing)"
-    )
+    if not code:
+        # Proxy whose implementation code could not be fetched
+        result["transfer_test"] = "⚠️ Proxy – transfer not verifiable"
+        result["bytecode_selectors"] = "Not verifiable (proxy)"
+        result["honeypot_risk"] = "🟡 Proxy – transfer not verifiable"
+    else:
+        # Transfer presence. Function selectors are PUSH4 immediates in the
+        # dispatcher, so a raw substring test on the runtime bytecode finds them.
+        has_transfer = TRANSFER_SELECTOR in code
+        result["transfer_test"] = "✅ Transfer function exists" if has_transfer else "❌ Missing transfer()"
+
+        # Other selectors of interest
+        found = [sig for sig, selector in BYTECODE_SELECTORS.items() if selector in code]
+        result["bytecode_selectors"] = ", ".join(found) if found else "None detected"
+
+        # Honeypot indicator
+        result["honeypot_risk"] = (
+            "🟢 Transfer function present"
+            if has_transfer
+            else "🔴 Possible Honeypot (transfer() missing)"
+        )
 
-    return result
+    if complete:
+        with _ONCHAIN_LOCK:
+            _ONCHAIN_CACHE[cache_key] = result
+    return dict(result)
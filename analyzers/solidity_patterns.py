@@ -1,9 +1,28 @@
-import requests
-import json
+import asyncio
+import hashlib
+import orjson
 import os
-from datetime import datetime
+import re
+import tempfile
+import threading
+import time
+import zstandard
+from collections import OrderedDict
+from pathlib import Path
 
-from typing import List, Dict
+from typing import List, Dict, Set, Tuple
+
+from analyzers.http import get_client, close_client
+
+try:
+    import re2 as _re  # optional: linear-time RE2 engine
+except ImportError:
+    import re as _re
+
+try:
+    import hyperscan  # optional: SIMD pattern matching for bulk scans
+except ImportError:
+    hyperscan = None
 
 # ---------------------------------------------------------------------------
 # Smart Contract Sentinel - Analyzer Module
@@ -13,24 +32,94 @@ from typing import List, Dict
 # potential honeypot, rug pull, or ownership issues.
 # ---------------------------------------------------------------------------
 
-def get_contract_source(address: str, chain: str = "ethereum") -> str:
-    """
-    Fetch verified contract source code using the appropriate Blockscout explorer.
-    Returns an empty string if the contract is unverified or not found.
-    """
-    # Choose the correct Blockscout domain based on the chain
-    chain_domains = {
-        "ethereum": "eth.blockscout.com",
-        "bsc": "bsc.blockscout.com",
-        "polygon": "polygon.blockscout.com",
-    }
+# Blockscout domain per chain
+CHAIN_DOMAINS = {
+    "ethereum": "eth.blockscout.com",
+    "bsc": "bsc.blockscout.com",
+    "polygon": "polygon.blockscout.com",
+}
+
+# ---------------------------------------------------------------------------
+# Verified source cache
+# ---------------------------------------------------------------------------
+# Verified source never changes for a given address, so it is kept in memory
+# and as zstd-compressed files under reports/.cache/<chain>/. Unverified
+# contracts are not cached, since they may be verified later.
+
+SOURCE_CACHE_DIR = Path("reports") / ".cache"
+SOURCE_MEMO_SIZE = 1024
+
+# LRU: hits move to the end, eviction pops from the front
+_source_memo: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+
+
+def _source_cache_path(chain: str, address: str) -> Path:
+    key = hashlib.blake2b(f"{chain}:{address.lower()}".encode(), digest_size=16).hexdigest()
+    return SOURCE_CACHE_DIR / chain / f"{key}.sol.zst"
+
+
+def _read_cached_source(chain: str, address: str) -> str:
+    try:
+        data = _source_cache_path(chain, address).read_bytes()
+        return zstandard.ZstdDecompressor().decompress(data).decode("utf-8")
+    except (OSError, zstandard.ZstdError, UnicodeDecodeError):
+        return ""
+
+
+def _write_cached_source(chain: str, address: str, source_code: str):
+    path = _source_cache_path(chain, address)
+    data = zstandard.ZstdCompressor(level=10).compress(source_code.encode("utf-8"))
+    tmp_name = None
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Unique temp file per writer: concurrent first scans of one address
+        # run in separate threads of the same process.
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f"{path.name}.", suffix=".tmp")
+        with os.fdopen(fd, "wb") as tmp:
+            tmp.write(data)
+        os.replace(tmp_name, path)
+    except OSError as e:
+        if tmp_name and os.path.exists(tmp_name):
+            os.remove(tmp_name)
+        print("⚠️ Failed to cache contract source:", e)
+
 
-    domain = chain_domains.get(chain.lower(), "eth.blockscout.com")
+def _remember_source(chain: str, address: str, source_code: str):
+    key = (chain, address.lower())
+    _source_memo[key] = source_code
+    _source_memo.move_to_end(key)
+    if len(_source_memo) > SOURCE_MEMO_SIZE:
+        _source_memo.popitem(last=False)
+
+
+async def _get_source(chain: str, address: str) -> str:
+    key = (chain, address.lower())
+    source_code = _source_memo.get(key)
+    if source_code:
+        _source_memo.move_to_end(key)
+        return source_code
+
+    # Disk reads/writes and zstd (de)compression of multi-MB sources run in a
+    # worker thread so they don't stall the event loop.
+    source_code = await asyncio.to_thread(_read_cached_source, chain, address)
+    if source_code:
+        print("✅ Contract source loaded from cache.")
+    else:
+        source_code = await _fetch_source(CHAIN_DOMAINS[chain], address)
+        if source_code:
+            await asyncio.to_thread(_write_cached_source, chain, address, source_code)
+
+    if source_code:
+        _remember_source(chain, address, source_code)
+    return source_code
+
+
+async def _fetch_source(domain: str, address: str) -> str:
     url = f"https://{domain}/api?module=contract&action=getsourcecode&address={address}"
 
     try:
-        resp = requests.get(url, timeout=15)
-        data = resp.json()
+        resp = await get_client().get(url)
+        data = orjson.loads(resp.content)
     except Exception as e:
         print("❌ Failed to connect to Blockscout:", e)
         return ""
@@ -58,17 +147,177 @@ def get_contract_source(address: str, chain: str = "ethereum") -> str:
         return ""
 
 
+async def get_contract_source_async(address: str, chain: str = "ethereum") -> str:
+    """
+    Fetch verified contract source code using the appropriate Blockscout explorer.
+    With chain="auto", all explorers are probed in parallel and the first
+    verified hit wins. Returns an empty string if the contract is unverified
+    or not found.
+    """
+    chain = chain.lower()
+    if chain == "auto":
+        tasks = [asyncio.create_task(_get_source(c, address)) for c in CHAIN_DOMAINS]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                source_code = await next_done
+                if source_code:
+                    return source_code
+            return ""
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    if chain not in CHAIN_DOMAINS:
+        chain = "ethereum"
+    return await _get_source(chain, address)
+
+
+def get_contract_source(address: str, chain: str = "ethereum") -> str:
+    """
+    Blocking wrapper around get_contract_source_async() for the CLI.
+    """
+    async def _run():
+        try:
+            return await get_contract_source_async(address, chain)
+        finally:
+            await close_client()
+
+    return asyncio.run(_run())
+
+
 # ---------------------------------------------------------------------------
 # Analyze Solidity source for risk patterns and compute a risk score
 # ---------------------------------------------------------------------------
 
+# pattern -> (message, score impact, severity)
+CHECKS = {
+    "onlyOwner": ("✅ Contains access control using onlyOwner.", 0, "Low"),
+    "mint": ("⚠️ Mint function found (check if restricted).", -20, "Medium"),
+    "blacklist": ("⚠️ Blacklist logic detected (potential sell restriction).", -15, "Medium"),
+    "tx.origin": ("🚨 Uses tx.origin — potential phishing risk.", -40, "High"),
+    "renounceOwnership": ("✅ Ownership can be renounced.", +20, "Low"),
+}
+
+# Score impact per check, in CHECKS order (consumed by _score())
+_IMPACTS = [impact for _, impact, _ in CHECKS.values()]
+
+# All patterns compiled into one case-insensitive alternation so the source is
+# scanned in a single pass. Each pattern is one numbered group, and a match is
+# mapped back through m.lastindex (both engines agree on that; RE2 returns
+# lastgroup as bytes for bytes patterns). RE2 is used when installed, which
+# keeps the scan linear-time even once patterns gain alternations/wildcards;
+# the inline (?i) flag works with both engines.
+#
+# Alternatives are ordered longest first, so a match is the longest pattern
+# starting at that position; every shorter pattern matching there is one of
+# its prefixes (_MATCH_IMPLIES). find_patterns() resumes one character past
+# each match start rather than at its end, so overlapping occurrences
+# ("mintx.origin") are still found. Lookaheads would do the same but RE2
+# does not support them.
+#
+# The pattern is compiled as bytes and run over the UTF-8 encoded source: RE2
+# re-encodes a str haystack on every search() call, which would make the
+# resume loop quadratic.
+_LONGEST_FIRST = sorted(CHECKS, key=len, reverse=True)
+_PATTERN_RE = _re.compile(
+    ("(?i)" + "|".join(f"({re.escape(pattern)})" for pattern in _LONGEST_FIRST)).encode()
+)
+_GROUP_TO_PATTERN = dict(enumerate(_LONGEST_FIRST, start=1))
+_MATCH_IMPLIES = {
+    pattern: {other for other in CHECKS if pattern.lower().startswith(other.lower())}
+    for pattern in CHECKS
+}
+
+# When hyperscan is installed, the same patterns are compiled once into a
+# Hyperscan database that every scanned source is streamed through. The
+# database shares a single scratch space, hence the lock.
+_PATTERNS = list(CHECKS)
+_HS_DB = None
+_HS_LOCK = threading.Lock()
+
+if hyperscan is not None:
+    _HS_DB = hyperscan.Database()
+    _HS_DB.compile(
+        expressions=[re.escape(pattern).encode() for pattern in _PATTERNS],
+        ids=list(range(len(_PATTERNS))),
+        elements=len(_PATTERNS),
+        flags=[hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SINGLEMATCH] * len(_PATTERNS),
+    )
+
+
+def find_patterns(source_code: str) -> Set[str]:
+    """
+    Return the CHECKS patterns that occur in source_code (case-insensitive).
+    Scanning stops as soon as every pattern has been seen.
+    """
+    data = source_code.encode("utf-8")
+
+    if _HS_DB is not None:
+        hits = set()
+
+        def on_match(pattern_id, start, end, flags, context):
+            hits.add(_PATTERNS[pattern_id])
+            return len(hits) == len(_PATTERNS)  # True terminates the scan
+
+        with _HS_LOCK:
+            try:
+                _HS_DB.scan(data, match_event_handler=on_match)
+            except hyperscan.error:
+                # Raised for HS_SCAN_TERMINATED too; only that case is expected
+                if len(hits) < len(_PATTERNS):
+                    raise
+        return hits
+
+    hits = set()
+    pos = 0
+    while len(hits) < len(_PATTERNS):
+        m = _PATTERN_RE.search(data, pos)
+        if m is None:
+            break
+        hits |= _MATCH_IMPLIES[_GROUP_TO_PATTERN[m.lastindex]]
+        pos = m.start() + 1
+    return hits
+
+
+
 def analyze_contract(address: str, chain: str) -> List[Dict]:
     """
     Fetch contract, scan for security patterns, and assign a risk score.
     """
+    return analyze_source(get_contract_source(address, chain))
+
+
+async def analyze_contract_async(address: str, chain: str) -> List[Dict]:
+    """
+    Async variant of analyze_contract() for callers running an event loop.
+    """
+    return analyze_source(await get_contract_source_async(address, chain))
+
+
+def _score(hit_mask: List[bool]) -> Tuple[int, int]:
+    """
+    Return (risk_score, issues) for a verified contract, given which CHECKS
+    entries matched (in CHECKS order). Score is clamped to 0–100.
+    """
+    risk_score = 100  # start high and deduct on risky findings
+    issues = 0
+    for hit, impact in zip(hit_mask, _IMPACTS):
+        if hit:
+            risk_score += impact
+            if impact < 0:
+                issues += 1
+
+    # No-issue bonus
+    if issues == 0:
+        risk_score += 10
 
-    # ----------------- Fetch contract -----------------
-    source_code = get_contract_source(address, chain)
+    return max(0, min(100, risk_score)), issues
+
+
+def analyze_source(source_code: str) -> List[Dict]:
+    """
+    Scan already-fetched Solidity source for security patterns and assign a risk score.
+    """
     results = []
     risk_score = 100  # start high and deduct on risky findings
 
@@ -83,35 +332,23 @@ def analyze_contract(address: str, chain: str) -> List[Dict]:
         results.append({
             "status": "⚠️ Risk",
             "message": f"Overall Risk Score: {max(risk_score,0)}/100 (Critical)",
-            "severity": "High"
+            "severity": "High",
+            "score": max(risk_score, 0)
         })
         return results
 
     # ----------------- Pattern checks -----------------
-    checks = {
-        "onlyOwner": ("✅ Contains access control using onlyOwner.", 0),
-        "mint": ("⚠️ Mint function found (check if restricted).", -20),
-        "blacklist": ("⚠️ Blacklist logic detected (potential sell restriction).", -15),
-        "tx.origin": ("🚨 Uses tx.origin — potential phishing risk.", -40),
-        "renounceOwnership": ("✅ Ownership can be renounced.", +20),
-    }
+    found = find_patterns(source_code)
+    hit_mask = [pattern in found for pattern in CHECKS]
+    risk_score, issues = _score(hit_mask)
 
-    issues = 0
-    for pattern, (message, impact) in checks.items():
-        if pattern.lower() in source_code.lower():
-            severity = (
-                "High" if "🚨" in message
-                else "Medium" if "⚠️" in message
-                else "Low"
-            )
+    for hit, (message, impact, severity) in zip(hit_mask, CHECKS.values()):
+        if hit:
             results.append({
                 "status": message.split(" ")[0],
                 "message": message,
                 "severity": severity
             })
-            risk_score += impact
-            if impact < 0:
-                issues += 1
 
     # ----------------- Safe / No issue case -----------------
     if issues == 0:
@@ -120,10 +357,6 @@ def analyze_contract(address: str, chain: str) -> List[Dict]:
             "message": "No known risk patterns detected.",
             "severity": "Low"
         })
-        risk_score += 10
-
-    # ----------------- Clamp risk score between 0–100 -----------------
-    risk_score = max(0, min(100, risk_score))
 
     # ----------------- Risk level labels -----------------
     risk_label = (
@@ -136,26 +369,37 @@ def analyze_contract(address: str, chain: str) -> List[Dict]:
     results.append({
         "status": "📊 Summary",
         "message": f"Verified: ✅ | Issues Found: {issues} | Overall Risk: {risk_score}/100 ({risk_label})",
-        "severity": "Info"
+        "severity": "Info",
+        "score": risk_score
     })
 
     return results
 
 def save_scan_report(address: str, chain: str, results: List[Dict]):
     """
-    Save scan results to a timestamped JSON file.
+    Save scan results to a uniquely named JSON file.
     """
     # Ensure reports directory exists
     os.makedirs("reports", exist_ok=True)
 
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"reports/{chain}_{address[:6]}_{timestamp}.json"
+    # Nanosecond timestamp keeps concurrent scans of the same address apart
+    filename = f"reports/{chain}_{address[:10]}_{time.time_ns()}.json"
 
+    # Write to a temp file in the same directory and rename it into place, so
+    # a crash mid-write never leaves a truncated report behind.
+    # os.open() with mode 0o666 applies the process umask, like a plain open().
+    tmp_name = None
+    candidate = f"reports/.tmp-{os.getpid()}-{threading.get_ident()}-{time.time_ns()}.json"
     try:
-        with open(filename, "w", encoding="utf-8") as f:
-            json.dump(results, f, indent=4)
+        fd = os.open(candidate, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+        tmp_name = candidate
+        with os.fdopen(fd, "wb") as tmp:
+            tmp.write(orjson.dumps(results, option=orjson.OPT_INDENT_2))
+        os.replace(tmp_name, filename)
         print(f"\n📝 Report saved successfully → {filename}")
     except Exception as e:
+        if tmp_name and os.path.exists(tmp_name):
+            os.remove(tmp_name)
         print("❌ Failed to save report:", e)
 
 # ---------------------------------------------------------------------------
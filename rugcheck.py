@@ -1,7 +1,5 @@
 import argparse
-from colorama import Fore, Style
-from analyzers.solidity_patterns import analyze_contract, save_scan_report
-from analyzers.onchain_checks import check_honeypot_and_owner
+import asyncio
 
 # ---------------------------------------------------------------------------
 # Smart Contract Sentinel - Main Entry Point
@@ -29,10 +27,31 @@ def main():
         help="Target blockchain (ethereum, bsc, polygon). Default: ethereum"
     )
     args = parser.parse_args()
+    asyncio.run(main_async(args))
 
-    # ------------------ Start Static Analysis ------------------
+
+async def main_async(args):
+    # Heavy imports (eth_abi, httpx, zstandard, ...) are deferred until after
+    # argument parsing so --help and usage errors return instantly.
+    from colorama import Fore, Style
+    from analyzers.http import close_client
+    from analyzers.solidity_patterns import analyze_contract_async, save_scan_report
+    from analyzers.onchain_checks import check_honeypot_and_owner_async
+
+    # ------------------ Run Static + On-Chain Analysis ------------------
+    # Both share one HTTP client and run concurrently.
     print(f"{Fore.CYAN}🔍 Scanning {args.address} on {args.chain.title()}...{Style.RESET_ALL}")
-    results = analyze_contract(args.address, args.chain)
+    try:
+        results, onchain_results = await asyncio.gather(
+            analyze_contract_async(args.address, args.chain),
+            check_honeypot_and_owner_async(args.address),
+            return_exceptions=True,
+        )
+    finally:
+        await close_client()
+
+    if isinstance(results, Exception):
+        raise results
 
     print(f"\n{Fore.WHITE}=== Static Scan Results ==={Style.RESET_ALL}")
     for r in results:
@@ -46,13 +65,12 @@ def main():
 
     # ------------------ On-Chain Analysis ------------------
     print(f"\n{Fore.MAGENTA}=== On-Chain Analysis ==={Style.RESET_ALL}")
-    try:
-        onchain_results = check_honeypot_and_owner(args.address)
+    if isinstance(onchain_results, Exception):
+        print(f"{Fore.RED}❌ On-chain analysis failed:{Style.RESET_ALL} {onchain_results}")
+        onchain_results = {"error": str(onchain_results)}
+    else:
         for key, val in onchain_results.items():
             print(f"{Fore.MAGENTA}{key}:{Style.RESET_ALL} {val}")
-    except Exception as e:
-        print(f"{Fore.RED}❌ On-chain analysis failed:{Style.RESET_ALL} {e}")
-        onchain_results = {"error": str(e)}
 
     # ------------------ Save Combined Report ------------------
     combined_report = results + [{"status": "🔗 On-chain", "message": str(onchain_results), "severity": "Info"}]
@@ -1,10 +1,12 @@
 import os
+import sys
 import json
+import time
+import asyncio
 from telegram import Update
 from telegram.ext import ApplicationBuilder, CommandHandler, ContextTypes
+from telegram.helpers import escape_markdown
 from dotenv import load_dotenv
-from analyzers.solidity_patterns import analyze_contract, save_scan_report
-from analyzers.onchain_checks import check_honeypot_and_owner
 
 # ---------------------------------------------------------------------------
 # Load Environment
@@ -12,6 +14,48 @@ from analyzers.onchain_checks import check_honeypot_and_owner
 load_dotenv()
 BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 
+# Public HTTPS base URL (e.g. https://bot.example.com) — enables webhook mode.
+# TLS is terminated by the reverse proxy, which forwards to PORT locally.
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")
+PORT = int(os.getenv("PORT", "8443"))
+
+# ---------------------------------------------------------------------------
+# Lazy analyzer access
+# ---------------------------------------------------------------------------
+# The analyzers pull in httpx, eth-abi/eth-utils and zstandard; load them on
+# the first /scan or /score instead of at bot startup.
+
+def _analyzers():
+    from analyzers import solidity_patterns, onchain_checks
+    return solidity_patterns, onchain_checks
+
+# ---------------------------------------------------------------------------
+# Shared scan helpers
+# ---------------------------------------------------------------------------
+
+async def _run_scan(address: str, chain: str):
+    # Blockscout and RPC lookups are independent — run them side by side
+    # so the event loop stays free for other users.
+    solidity_patterns, onchain_checks = _analyzers()
+    return await asyncio.gather(
+        solidity_patterns.analyze_contract_async(address, chain),
+        onchain_checks.check_honeypot_and_owner_async(address, chain),
+    )
+
+def _format_scan(chain: str, results, onchain_results) -> str:
+    static_summary = next(
+        (r["message"] for r in results if r["status"] == "📊 Summary"), "No summary."
+    )
+
+    # Keys (transfer_test, bytecode_selectors, ...) and on-chain values such as
+    # token names can contain Markdown control characters; unbalanced ones
+    # make Telegram reject the whole message.
+    reply = f"✅ *Static Analysis:*\n{escape_markdown(static_summary)}\n\n"
+    reply += f"🔗 *On-Chain Checks ({chain.title()}):*\n"
+    for k, v in onchain_results.items():
+        reply += f"• {escape_markdown(str(k))}: {escape_markdown(str(v))}\n"
+    return reply
+
 # ---------------------------------------------------------------------------
 # Core Commands
 # ---------------------------------------------------------------------------
@@ -40,7 +84,7 @@ async def about(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "🧠 *About Smart Contract Sentinel*\n"
         "Detects potential *rug pulls*, *honeypots*, and risky Solidity code.\n\n"
         "✅ Supports Ethereum & BNB Chain\n"
-        "⚙️ Built with Python, Web3.py, and Telegram Bot API.\n\n"
+        "⚙️ Built with Python, httpx, eth-abi, and Telegram Bot API.\n\n"
         "Developed by *L1GHT* — powered by @ashon_chain."
     )
     await update.message.reply_text(msg, parse_mode="Markdown")
@@ -73,23 +117,18 @@ async def scan(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(f"🔍 Scanning {address} on {chain.title()}...")
 
     try:
-        results = analyze_contract(address, chain)
-        onchain_results = check_honeypot_and_owner(address, chain)
+        results, onchain_results = await _run_scan(address, chain)
+        reply = _format_scan(chain, results, onchain_results)
 
-        static_summary = next(
-            (r["message"] for r in results if r["status"] == "📊 Summary"), "No summary."
-        )
+        solidity_patterns, _ = _analyzers()
+        await asyncio.to_thread(solidity_patterns.save_scan_report, address, chain, results)
 
-        reply = f"✅ *Static Analysis:*\n{static_summary}\n\n"
-        reply += f"🔗 *On-Chain Checks ({chain.title()}):*\n"
-        for k, v in onchain_results.items():
-            reply += f"• {k}: {v}\n"
-
-        save_scan_report(address, chain, results)
+        # Keep only what's needed to re-render; /last re-runs the (cached) scan
         context.user_data["last_report"] = {
             "address": address,
             "chain": chain,
-            "summary": reply,
+            "score": next((r["score"] for r in results if "score" in r), None),
+            "ts": time.time(),
         }
 
         await update.message.reply_text(reply, parse_mode="Markdown")
@@ -120,7 +159,8 @@ async def score(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(f"📊 Calculating risk score for {address} on {chain.title()}...")
 
     try:
-        results = analyze_contract(address, chain)
+        solidity_patterns, _ = _analyzers()
+        results = await solidity_patterns.analyze_contract_async(address, chain)
         static_summary = next(
             (r["message"] for r in results if r["status"] == "📊 Summary"), "No summary."
         )
@@ -139,11 +179,22 @@ async def last(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("📭 No previous scan found. Use /scan first.")
         return
 
+    address = last_report["address"]
+    chain = last_report["chain"]
+
+    try:
+        results, onchain_results = await _run_scan(address, chain)
+    except Exception as e:
+        await update.message.reply_text(f"❌ Scan failed: {e}")
+        return
+
+    minutes_ago = int((time.time() - last_report["ts"]) // 60)
     msg = (
         f"📝 *Last Scan Summary*\n"
-        f"Contract: `{last_report['address']}`\n"
-        f"Chain: {last_report['chain'].title()}\n\n"
-        f"{last_report['summary']}"
+        f"Contract: `{address}`\n"
+        f"Chain: {chain.title()}\n"
+        f"Score at scan time: {last_report['score']}/100 ({minutes_ago} min ago)\n\n"
+        f"{_format_scan(chain, results, onchain_results)}"
     )
     await update.message.reply_text(msg, parse_mode="Markdown")
 
@@ -151,8 +202,13 @@ async def last(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # Launch Bot
 # ---------------------------------------------------------------------------
 
+async def shutdown(app):
+    http = sys.modules.get("analyzers.http")
+    if http is not None:
+        await http.close_client()
+
 def main():
-    app = ApplicationBuilder().token(BOT_TOKEN).build()
+    app = ApplicationBuilder().token(BOT_TOKEN).post_shutdown(shutdown).build()
 
     app.add_handler(CommandHandler("start", start))
     app.add_handler(CommandHandler("help", help_command))
@@ -161,8 +217,17 @@ def main():
     app.add_handler(CommandHandler("score", score))
     app.add_handler(CommandHandler("last", last))
 
-    print("🤖 Bot running... Press Ctrl + C to stop.")
-    app.run_polling()
+    if WEBHOOK_URL:
+        print(f"🤖 Bot running (webhook on port {PORT})... Press Ctrl + C to stop.")
+        app.run_webhook(
+            listen="0.0.0.0",
+            port=PORT,
+            url_path=BOT_TOKEN,
+            webhook_url=f"{WEBHOOK_URL.rstrip('/')}/{BOT_TOKEN}",
+        )
+    else:
+        print("🤖 Bot running... Press Ctrl + C to stop.")
+        app.run_polling()
 
 if __name__ == "__main__":
     main()